@@ -1,6 +1,7 @@
 """ This module contains CRC(16-bits) algorithms. """
+import numbers
 
-_modbus_table = [
+_modbus_table = (
     0X0000, 0XC0C1, 0XC181, 0X0140, 0XC301, 0X03C0, 0X0280, 0XC241,
     0XC601, 0X06C0, 0X0780, 0XC741, 0X0500, 0XC5C1, 0XC481, 0X0440,
     0XCC01, 0X0CC0, 0X0D80, 0XCD41, 0X0F00, 0XCFC1, 0XCE81, 0X0E40,
@@ -33,23 +34,35 @@ _modbus_table = [
     0X4E00, 0X8EC1, 0X8F81, 0X4F40, 0X8D01, 0X4DC0, 0X4C80, 0X8C41,
     0X4400, 0X84C1, 0X8581, 0X4540, 0X8701, 0X47C0, 0X4680, 0X8641,
     0X8201, 0X42C0, 0X4380, 0X8341, 0X4100, 0X81C1, 0X8081, 0X4040
-]
+)
 
-def modbus(data):
+def modbus(data, crc=0xFFFF):
     """Calculate the Modbus CRC
         
         Args:
             data (List[int]): Data bytes 
+            crc (int): Initial CRC value on 16-bits, pass a previously returned CRC to continue the calculation over more data
         
         Returns:
             int: CRC value on 16-bits
+
+        Raises:
+            ValueError: If data holds values out of uint8 range or the initial CRC value is out of uint16 range
             
     """
      
-    crc = 0xFFFF
-    for value in data:
-        if not 0 <= value <= 0xFF:
+    if not (0 <= crc <= 0xFFFF):
+        raise ValueError("Expecting a 16-bits initial CRC value")
+    if not isinstance(data, bytearray):
+        # bytearray(n) would make n zero bytes, an int is not a sequence of bytes
+        if isinstance(data, numbers.Integral):
             raise ValueError("Expecting uint8 values")
-        index = (crc ^ value) & 0xFF
-        crc = (crc >> 8) ^ _modbus_table[index]
-    return crc & 0xFFFF
+        # bytearray range checks the values in C, so the loop below doesn't have to
+        try:
+            data = bytearray(data)
+        except (TypeError, ValueError):
+            raise ValueError("Expecting uint8 values")
+    table = _modbus_table
+    for value in data:
+        crc = (crc >> 8) ^ table[(crc ^ value) & 0xFF]
+    return crc
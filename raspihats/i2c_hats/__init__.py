@@ -1,18 +1,22 @@
 """
 This module contains the I2C-HATs classes.
 """
+import smbus2
 from ._base import I2CHat, Cwdt, Irq, ResponseException
 from ._digital import DigitalOutputs, DigitalInputs
 
 def set_i2c_port(i2c_port):
-    """Set the I2C port number.
+    """Set the I2C port number. It should be called before any I2C-HAT instance is created, the bus is shared by all of them.
+    The previously opened bus, if any, is closed.
 
     Args:
         i2c_port (int): I2C port number
 
     """
-    import smbus
-    I2CHat._i2c_bus = smbus.SMBus(i2c_port)
+    with I2CHat._i2c_bus_lock:
+        if I2CHat._i2c_bus is not None:
+            I2CHat._i2c_bus.close()
+        I2CHat._i2c_bus = smbus2.SMBus(i2c_port)
 
 class Di16(I2CHat):
     """This class exposes all operations supported by the Di16 I2C-HAT.
@@ -28,12 +32,14 @@ class Di16(I2CHat):
 
     _BASE_ADDRESS = 0x40
     _BOARD_NAME = 'Di16 I2C-HAT'
-    _labels = [
+    _labels = (
         'Di1.1', 'Di1.2', 'Di1.3', 'Di1.4',
         'Di2.1', 'Di2.2', 'Di2.3', 'Di2.4',
         'Di3.1', 'Di3.2', 'Di3.3', 'Di3.4',
         'Di4.1', 'Di4.2', 'Di4.3', 'Di4.4',
-    ]
+    )
+
+    __slots__ = ('cwdt', 'di')
 
     def __init__(self, address):
         I2CHat.__init__(self, address, self._BASE_ADDRESS, self._BOARD_NAME)
@@ -53,7 +59,9 @@ class Rly10(I2CHat):
 
     _BASE_ADDRESS = 0x50
     _BOARD_NAME = 'Rly10 I2C-HAT'
-    _labels = ['Rly1', 'Rly2', 'Rly3', 'Rly4', 'Rly5', 'Rly6', 'Rly7', 'Rly8', 'Rly9', 'Rly10']
+    _labels = ('Rly1', 'Rly2', 'Rly3', 'Rly4', 'Rly5', 'Rly6', 'Rly7', 'Rly8', 'Rly9', 'Rly10')
+
+    __slots__ = ('cwdt', 'dq')
 
     def __init__(self, address):
         I2CHat.__init__(self, address, self._BASE_ADDRESS, self._BOARD_NAME)
@@ -75,8 +83,10 @@ class Di6Rly6(I2CHat):
 
     _BASE_ADDRESS = 0x60
     _BOARD_NAME = 'Di6Rly6 I2C-HAT'
-    _di_labels = ['Di1.1', 'Di1.2', 'Di1.3', 'Di1.4', 'Di1.5', 'Di1.6']
-    _dq_labels = ['Rly1', 'Rly2', 'Rly3', 'Rly4', 'Rly5', 'Rly6']
+    _di_labels = ('Di1.1', 'Di1.2', 'Di1.3', 'Di1.4', 'Di1.5', 'Di1.6')
+    _dq_labels = ('Rly1', 'Rly2', 'Rly3', 'Rly4', 'Rly5', 'Rly6')
+
+    __slots__ = ('cwdt', 'di', 'dq')
 
     def __init__(self, address):
         I2CHat.__init__(self, address, self._BASE_ADDRESS, self._BOARD_NAME)
@@ -98,8 +108,9 @@ class DI16ac(I2CHat):
 
     _BASE_ADDRESS = 0x40
     _BOARD_NAME = 'DI16ac I2C-HAT'
-    _labels = ['I0', 'I1', 'I2', 'I3', 'I4', 'I5', 'I6', 'I7', 'I8', 'I9', 'I10', 'I11', 'I12', 'I13', 'I14', 'I15']
+    _labels = ('I0', 'I1', 'I2', 'I3', 'I4', 'I5', 'I6', 'I7', 'I8', 'I9', 'I10', 'I11', 'I12', 'I13', 'I14', 'I15')
 
+    __slots__ = ('cwdt', 'irq', 'di')
 
     def __init__(self, address):
         I2CHat.__init__(self, address, self._BASE_ADDRESS, self._BOARD_NAME)
@@ -120,7 +131,9 @@ class DQ16oc(I2CHat):
 
     _BASE_ADDRESS = 0x50
     _BOARD_NAME = 'DQ16oc I2C-HAT'
-    _labels = ['Q0', 'Q1', 'Q2', 'Q3', 'Q4', 'Q5', 'Q6', 'Q7', 'Q8', 'Q9', 'Q10', 'Q11', 'Q12', 'Q13', 'Q14', 'Q15']
+    _labels = ('Q0', 'Q1', 'Q2', 'Q3', 'Q4', 'Q5', 'Q6', 'Q7', 'Q8', 'Q9', 'Q10', 'Q11', 'Q12', 'Q13', 'Q14', 'Q15')
+
+    __slots__ = ('cwdt', 'dq')
 
     def __init__(self, address):
         I2CHat.__init__(self, address, self._BASE_ADDRESS, self._BOARD_NAME)
@@ -140,7 +153,9 @@ class DQ10rly(I2CHat):
 
     _BASE_ADDRESS = 0x50
     _BOARD_NAME = 'DQ10rly I2C-HAT'
-    _labels = ['Q0', 'Q1', 'Q2', 'Q3', 'Q4', 'Q5', 'Q6', 'Q7', 'Q8', 'Q9']
+    _labels = ('Q0', 'Q1', 'Q2', 'Q3', 'Q4', 'Q5', 'Q6', 'Q7', 'Q8', 'Q9')
+
+    __slots__ = ('cwdt', 'dq')
 
     def __init__(self, address):
         I2CHat.__init__(self, address, self._BASE_ADDRESS, self._BOARD_NAME)
@@ -160,7 +175,9 @@ class DQ8rly(I2CHat):
 
     _BASE_ADDRESS = 0x50
     _BOARD_NAME = 'DQ8rly I2C-HAT'
-    _labels = ['Q0', 'Q1', 'Q2', 'Q3', 'Q4', 'Q5', 'Q6', 'Q7']
+    _labels = ('Q0', 'Q1', 'Q2', 'Q3', 'Q4', 'Q5', 'Q6', 'Q7')
+
+    __slots__ = ('cwdt', 'dq')
 
     def __init__(self, address):
         I2CHat.__init__(self, address, self._BASE_ADDRESS, self._BOARD_NAME)
@@ -180,7 +197,9 @@ class DQ5rly(I2CHat):
 
     _BASE_ADDRESS = 0x50
     _BOARD_NAME = 'DQ5rly I2C-HAT'
-    _labels = ['Q0', 'Q1', 'Q2', 'Q3', 'Q4']
+    _labels = ('Q0', 'Q1', 'Q2', 'Q3', 'Q4')
+
+    __slots__ = ('cwdt', 'dq')
 
     def __init__(self, address):
         I2CHat.__init__(self, address, self._BASE_ADDRESS, self._BOARD_NAME)
@@ -202,8 +221,10 @@ class DI6acDQ6rly(I2CHat):
 
     _BASE_ADDRESS = 0x60
     _BOARD_NAME = 'DI6acDQ6rly I2C-HAT'
-    _di_labels = ['I0', 'I1', 'I2', 'I3', 'I4', 'I5']
-    _dq_labels = ['Q0', 'Q1', 'Q2', 'Q3', 'Q4', 'Q5']
+    _di_labels = ('I0', 'I1', 'I2', 'I3', 'I4', 'I5')
+    _dq_labels = ('Q0', 'Q1', 'Q2', 'Q3', 'Q4', 'Q5')
+
+    __slots__ = ('cwdt', 'irq', 'di', 'dq')
 
     def __init__(self, address):
         I2CHat.__init__(self, address, self._BASE_ADDRESS, self._BOARD_NAME)
@@ -227,8 +248,10 @@ class DI6acDQ6ssr(I2CHat):
 
     _BASE_ADDRESS = 0x60
     _BOARD_NAME = 'DI6acDQ6ssr I2C-HAT'
-    _di_labels = ['I0', 'I1', 'I2', 'I3', 'I4', 'I5']
-    _dq_labels = ['Q0', 'Q1', 'Q2', 'Q3', 'Q4', 'Q5']
+    _di_labels = ('I0', 'I1', 'I2', 'I3', 'I4', 'I5')
+    _dq_labels = ('Q0', 'Q1', 'Q2', 'Q3', 'Q4', 'Q5')
+
+    __slots__ = ('cwdt', 'irq', 'di', 'dq')
 
     def __init__(self, address):
         I2CHat.__init__(self, address, self._BASE_ADDRESS, self._BOARD_NAME)
@@ -253,8 +276,10 @@ class DI6dwDQ6ssr(I2CHat):
 
     _BASE_ADDRESS = 0x60
     _BOARD_NAME = 'DI6dwDQ6ssr I2C-HAT'
-    _di_labels = ['I0', 'I1', 'I2', 'I3', 'I4', 'I5']
-    _dq_labels = ['Q0', 'Q1', 'Q2', 'Q3', 'Q4', 'Q5']
+    _di_labels = ('I0', 'I1', 'I2', 'I3', 'I4', 'I5')
+    _dq_labels = ('Q0', 'Q1', 'Q2', 'Q3', 'Q4', 'Q5')
+
+    __slots__ = ('cwdt', 'irq', 'di', 'dq')
 
     def __init__(self, address):
         I2CHat.__init__(self, address, self._BASE_ADDRESS, self._BOARD_NAME)
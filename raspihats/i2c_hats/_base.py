@@ -3,6 +3,7 @@ This module contains the I2CHat base class.
 """
 import sys
 import time
+import struct
 import smbus2
 import threading
 try:
@@ -11,6 +12,9 @@ except ImportError:
   from enum34 import Enum
 from ._frame import Command, Frame, DecodeException
 
+# little endian unsigned32, the byte order used by the I2C-HATs
+_U32 = struct.Struct('<I')
+
 class ResponseException(Exception):
     """Raised when there's a problem with the I2C-HAT response."""
 
@@ -31,15 +35,20 @@ class I2CHat(object):
     """
     I2C_PORT = 1 # 1 is default port for Raspberry Pi
 
-    _i2c_bus_lock = threading.Lock()
+    _i2c_bus_lock = threading.RLock() # reentrant, so a sequence of transfers can hold the bus
     _i2c_bus = None
 
+    # __weakref__ keeps board instances weak referenceable, as they were before __slots__
+    __slots__ = ('_address', '_dummy_msg', '_name', '_fw_version', '_frame_id', '_transfer_time', '__weakref__')
+
     def __init__(self, address, base_address=None, board_name=None):
 
         if I2CHat._i2c_bus is None:
             I2CHat._i2c_bus = smbus2.SMBus(I2CHat.I2C_PORT)
 
         self._address = address
+        self._name = None
+        self._fw_version = None
         self._frame_id = 0
         self._transfer_time = None
 
@@ -50,6 +59,9 @@ class I2CHat(object):
             if address & base_address != base_address:
                 raise ValueError("I2C address should be in range[" + hex(base_address) + ", " + hex(base_address + 0x0F) + "]")
 
+        # the dummy byte write sent in front of every response read, it's never modified so it's built once
+        self._dummy_msg = smbus2.i2c_msg.write(address, [0xFF])
+
         if board_name != None:
             if self.name not in board_name:
                 raise Exception("unexpected board name '" + self.name + "', expecting '" + board_name + "'")
@@ -62,16 +74,76 @@ class I2CHat(object):
         string += "@" + hex(self._address)
         return string
 
-    def _generate_frame_id_(self):
-        """Generate new frame Id, increments current frame Id, wraps to 0x7F beacuse of Raspberry Pi I2C bug which affects MSb
+    def _transfer_once_(self, request_msg, response_msg, response_frame):
+        """Sends a request and gets a response over I2C bus, a single try. The I2C bus lock must be held by the caller.
+
+        Args:
+            request_msg (smbus2.i2c_msg): I2C write message holding the encoded request frame
+            response_msg (smbus2.i2c_msg): I2C read message for the response, None if a response is not expected
+            response_frame (Frame): Frame used to decode the response, None if a response is not expected
+
+        Returns:
+            Frame: The response frame
+
+        Raises:
+            IOError: If the I2C bus transfer fails
+            DecodeException: If the response frame can't be decoded
+
+        """
+        # NOTE: the request is an I2C transaction of its own, ending with a STOP
+        I2CHat._i2c_bus.i2c_rdwr(request_msg)
+        if response_msg is None:
+            return
+
+        # NOTE: the response is read like read_i2c_block_data does it, a write with a length of one and the dummy_byte as
+        # payload, this write will be ignored by the I2C-HAT, after this a i2c_read(repeated start) reads the response
+        I2CHat._i2c_bus.i2c_rdwr(self._dummy_msg, response_msg)
+
+        # bytes() copies the message buffer in C, iterating the message would box every byte
+        response_frame.decode(bytearray(bytes(response_msg)))
+        self._transfer_time = time.time()
+        return response_frame
+
+    def _transfer_retry_(self, request_msg, response_msg, response_frame, number_of_tries, ex):
+        """Retries a failed transfer, the slow path of _transfer_. The I2C bus lock is acquired for each try and released
+        while backing off, so other threads can use the bus in between. If the caller already holds the lock(e.g.
+        _transfer_batch_) it stays held while backing off, the backoff is then kept short to limit how long other threads
+        wait for the bus.
+
+        Args:
+            request_msg (smbus2.i2c_msg): I2C write message holding the encoded request frame
+            response_msg (smbus2.i2c_msg): I2C read message for the response, None if a response is not expected
+            response_frame (Frame): Frame used to decode the response, None if a response is not expected
+            number_of_tries (int): Number of tries to get the response, including the one that already failed
+            ex (Exception): The exception raised by the failed try
 
         Returns:
-            int: The new frame Id
+            Frame: The response frame
+
+        Raises:
+            ResponseException: After all attempts to get a response have failed
 
         """
-        self._frame_id += 1
-        self._frame_id &= 0x7F
-        return self._frame_id
+        # the reentrant lock isn't released by the 'with' below if an outer caller holds it
+        bus_held = I2CHat._i2c_bus_lock._is_owned()
+        try_cnt = 1
+        while try_cnt < number_of_tries:
+            if bus_held:
+                # the bus stays blocked while backing off, keep the delay between tries at 10ms
+                time.sleep(0.01)
+            else:
+                # back off exponentially between tries: 10ms, 20ms, 40ms, then 80ms
+                time.sleep(min(0.01 * (1 << (try_cnt - 1)), 0.08))
+            try_cnt += 1
+            with I2CHat._i2c_bus_lock:
+                try:
+                    return self._transfer_once_(request_msg, response_msg, response_frame)
+                except (IOError, DecodeException) as e:
+                    ex = e
+        if isinstance(ex, IOError):
+            raise ResponseException("no response")
+        else:
+            raise ResponseException(str(ex))
 
     def _transfer_(self, request_frame, response_data_size, response_expected=True, number_of_tries=5):
         """Tries a number of times to send a request frame and to get a response frame over I2C bus.
@@ -89,38 +161,40 @@ class I2CHat(object):
             ResponseException: After all attempts to get a response have failed
 
         """
+        # the request is encoded once, the I2C messages and the response frame are built once, all tries reuse them
+        request_msg = smbus2.i2c_msg.write(self._address, request_frame.encode())
+        response_msg = None
+        response_frame = None
+        if response_expected:
+            expected_response_size = Frame.OVERHEAD_SIZE + response_data_size
+            response_msg = smbus2.i2c_msg.read(self._address, expected_response_size)
+            response_frame = Frame(request_frame.id, request_frame.cmd)
         with I2CHat._i2c_bus_lock:
-            try_cnt = 1
-            while True:
-                try:
-                    request_data = request_frame.encode()
-
-                    # NOTE: write_i2c_block_data function is used to send commands to the I2C-HAT
-                    I2CHat._i2c_bus.write_i2c_block_data(self._address, request_data[0], request_data[1:])
-
-                    if not response_expected:
-                        return
-
-                    # NOTE: read_i2c_block_data function sends a i2c_write first, this write has a length of one, and the dummy_byte as payload, this
-                    # write will be ignored by the I2C-HAT, after this a i2c_read will be issued, this i2c_read is used for reading the response
-                    dummy_byte = 0xFF
-                    expected_response_size = Frame.ID_SIZE + Frame.CMD_SIZE + response_data_size + Frame.CRC_SIZE
-                    response_data = I2CHat._i2c_bus.read_i2c_block_data(self._address, dummy_byte, expected_response_size)
-
-                    # build response frame
-                    response_frame = Frame(request_frame.id, request_frame.cmd)
-                    response_frame.decode(response_data)
-                    self._transfer_time = time.time()
-                    return response_frame
-
-                except (IOError, DecodeException) as ex:
-                    if try_cnt >= number_of_tries:
-                        if isinstance(ex, IOError):
-                            raise ResponseException("no response")
-                        else:
-                            raise ResponseException(str(ex))
-                    time.sleep(0.01)
-                    try_cnt += 1
+            try:
+                return self._transfer_once_(request_msg, response_msg, response_frame)
+            except (IOError, DecodeException) as ex:
+                failure = ex
+        # retried outside the lock, a misbehaving board doesn't keep the bus from other threads while backing off
+        return self._transfer_retry_(request_msg, response_msg, response_frame, number_of_tries, failure)
+
+    def _transfer_batch_(self, requests, number_of_tries=5):
+        """Does a sequence of transfers, the I2C bus lock is acquired once and held for all of them. The lock is also held
+        while a failing transfer is retried, other threads wait for the retries too, up to 40ms per failing transfer.
+
+        Args:
+            requests (List[Tuple[Frame, int]]): Request frames paired with their expected response data size
+            number_of_tries (int): Number of tries to get each response
+
+        Returns:
+            List[Frame]: The response frames, in request order
+
+        Raises:
+            ResponseException: After all attempts to get one of the responses have failed
+
+        """
+        with I2CHat._i2c_bus_lock:
+            return [self._transfer_(request_frame, response_data_size, True, number_of_tries)
+                    for request_frame, response_data_size in requests]
 
     def _get_u32_value_(self, cmd):
         """Generic get for a unsigned32 value.
@@ -135,12 +209,12 @@ class I2CHat(object):
             ResponseException: If response has bad data length
 
         """
-        request = self._request_frame_(cmd, [])
+        request = self._request_frame_(cmd)
         response = self._transfer_(request, 4)
         data = response.data
         if len(data) != 4:
             raise ResponseException('invalid response data length')
-        return data[0] + (data[1] << 8) + (data[2] << 16) + (data[3] << 24)
+        return _U32.unpack(data)[0]
 
     def _set_u32_value_(self, cmd, value):
         """Generic set for a unsigned32 value.
@@ -155,24 +229,27 @@ class I2CHat(object):
         Raises:
             ResponseException: I response
         """
-        data = [value & 0xFF, (value >> 8) & 0xFF, (value >> 16) & 0xFF, (value >> 24) & 0xFF]
+        data = bytearray(_U32.pack(value & 0xFFFFFFFF))
         request = self._request_frame_(cmd, data)
         response = self._transfer_(request, 4)
         if data != response.data:
             raise ResponseException('invalid response data')
 
-    def _request_frame_(self, cmd, data = []):
-        """Build request frame, taking care of new frame Id generation.
+    def _request_frame_(self, cmd, data=b''):
+        """Build request frame, taking care of new frame Id generation. The frame Id is incremented and wraps to 0x7F
+        beacuse of Raspberry Pi I2C bug which affects MSb.
 
         Args:
             cmd (int): Frame command byte value
-            data (List[int]): Frame payload data
+            data (bytearray): Frame payload data
 
         Returns:
             Frame: The new Frame built with specified parameters
 
         """
-        return Frame(self._generate_frame_id_(), cmd, data)
+        frame_id = (self._frame_id + 1) & 0x7F
+        self._frame_id = frame_id
+        return Frame(frame_id, cmd, data)
 
     @property
     def transfer_time(self):
@@ -186,23 +263,25 @@ class I2CHat(object):
 
     @property
     def name(self):
-        """:obj:`string`: Name(*)."""
-        request = self._request_frame_(Command.GET_BOARD_NAME)
-        response = self._transfer_(request, 25)
-        board_name = ''
-        for byte in response.data:
-            if byte == 0:
-                break;
-            board_name += chr(byte)
-        return board_name
+        """:obj:`string`: Name, read from the I2C-HAT once, the board name can't change."""
+        if self._name is None:
+            request = self._request_frame_(Command.GET_BOARD_NAME)
+            response = self._transfer_(request, 25)
+            # the name is NUL terminated, latin-1 maps every byte to the same char code, like chr() does, on Python 2
+            # str is a byte string already and decoding would return unicode
+            name = response.data.split(b'\x00', 1)[0]
+            self._name = name.decode('latin-1') if sys.version_info[0] >= 3 else str(name)
+        return self._name
 
     @property
     def fw_version(self):
-        """:obj:`string`: Firmware version(*)."""
-        request = self._request_frame_(Command.GET_FIRMWARE_VERSION)
-        response = self._transfer_(request, 3)
-        data = response.data
-        return 'v' + chr(data[0] + 0x30) + '.' + chr(data[1] + 0x30)  + '.' + chr(data[2] + 0x30)
+        """:obj:`string`: Firmware version(*), read from the I2C-HAT once, the firmware can't change while the board is running."""
+        if self._fw_version is None:
+            request = self._request_frame_(Command.GET_FIRMWARE_VERSION)
+            response = self._transfer_(request, 3)
+            data = response.data
+            self._fw_version = 'v%d.%d.%d' % (data[0], data[1], data[2])
+        return self._fw_version
 
     @property
     def status(self):
@@ -257,38 +336,43 @@ class Functionality(object):
 
     """
 
+    __slots__ = ('_i2c_hat', '_labels', '_label_indexes', '_max_value', '_bit_masks')
+
     def __init__(self, i2c_hat, labels=None):
         self._i2c_hat = i2c_hat
         self._labels = labels
         if labels != None:
-            self._lc_labels = [l.lower() for l in labels]
+            # a tuple, the labels are shared by all instances of a board class and must not be modified through .labels
+            labels = self._labels = tuple(labels)
+            # labels are fixed for a board, so the lookup table and value range are computed once
+            self._label_indexes = dict((l.lower(), i) for i, l in enumerate(labels))
+            self._max_value = (0x01 << len(labels)) - 1
+            self._bit_masks = tuple(0x01 << i for i in range(len(labels)))
 
     def _validate_channel_index(self, index):
         if self._labels == None:
             raise Exception('no labels defined')
 
-        label = None
         if isinstance(index, int):
             if not (0 <= index < len(self._labels)):
                 raise IndexError("'" + str(index) + "' is not a valid channel index")
         elif isinstance(index, str):
             label = index
             try:
-                index = self._lc_labels.index(label.lower())
-            except ValueError:
+                index = self._label_indexes[label.lower()]
+            except KeyError:
                 raise ValueError("'" + label + "' is not a valid channel label")
         else:
-            raise ValueError("index type is '" + type(index) + "', expecting 'int' or 'str'")
+            raise ValueError("index type is '" + type(index).__name__ + "', expecting 'int' or 'str'")
         return index
 
     def _validate_value(self, value):
-        max_value = (0x01 << len(self._labels)) - 1
-        if not (0 <= value <= max_value):
-            raise ValueError("'" + str(value) + "' is not a valid value, range is [0x00 .. " + hex(max_value) + "]")
+        if not (0 <= value <= self._max_value):
+            raise ValueError("'" + str(value) + "' is not a valid value, range is [0x00 .. " + hex(self._max_value) + "]")
 
     @property
     def labels(self):
-        """:obj:`list` of :obj:`str`: Channel Labels."""
+        """:obj:`tuple` of :obj:`str`: Channel Labels."""
         return self._labels
 
 class Cwdt(Functionality):
@@ -301,6 +385,8 @@ class Cwdt(Functionality):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, i2c_hat):
         Functionality.__init__(self, i2c_hat)
 
@@ -332,25 +418,28 @@ class Irq(Functionality):
         DI_RISING_EDGE_CONTROL      = 0x21
         DI_CAPTURE                  = 0x22
 
+    __slots__ = ()
+
     def __init__(self, i2c_hat):
         Functionality.__init__(self, i2c_hat)
 
     def get_reg(self, reg_type):
         """:obj:`int`: The value of IRQ control reg, 1 bit represents 1 channel."""
-        request = self._i2c_hat._request_frame_(Command.IRQ_GET_REG, [reg_type])
+        request = self._i2c_hat._request_frame_(Command.IRQ_GET_REG, bytearray((reg_type,)))
         response = self._i2c_hat._transfer_(request, 5)
         data = response.data
         if (len(data) != 1 + 4) or (data[0] != reg_type):
             raise ResponseException('Invalid data')
-        return data[1] + (data[2] << 8) + (data[3] << 16) + (data[4] << 24)
+        return _U32.unpack_from(data, 1)[0]
 
     def set_reg(self, reg_type, value):
         """:obj:`int`: The value of IRQ control reg, 1 bit represents 1 channel."""
         # self._validate_value(value)
-        data = [reg_type, value & 0xFF, (value >> 8) & 0xFF, (value >> 16) & 0xFF, (value >> 24) & 0xFF]
+        data = bytearray((reg_type,))
+        data += _U32.pack(value & 0xFFFFFFFF)
         request = self._i2c_hat._request_frame_(Command.IRQ_SET_REG, data)
         response = self._i2c_hat._transfer_(request, 5)
         data = response.data
         if (len(data) != 1 + 4) or (data[0] != reg_type):
             raise ResponseException('Invalid data')
-        return data[1] + (data[2] << 8) + (data[3] << 16) + (data[4] << 24)
+        return _U32.unpack_from(data, 1)[0]
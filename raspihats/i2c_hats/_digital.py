@@ -1,12 +1,198 @@
+import time
 from ._frame import Command
-from ._base import ResponseException, Functionality, Irq
+from ._base import ResponseException, Functionality, Irq, _U32
 try:
   from enum import Enum
 except ImportError:
   from enum34 import Enum
 
 
-class DigitalInputs(Functionality):
+class _ChannelsFunctionality(Functionality):
+    """Channels functionality base, adds an optional cache for the value of all channels, used by single channel reads.
+
+    Args:
+        i2c_hat (:obj:`raspihats.i2c_hats._base.I2CHat`): I2CHat instance
+        labels (:obj:`list` of :obj:`str`): Channel labels
+
+    """
+
+    __slots__ = ('_cache_ttl', '_cache_value', '_cache_time')
+
+    def __init__(self, i2c_hat, labels):
+        Functionality.__init__(self, i2c_hat, labels)
+        self._cache_ttl = 0
+        self._cache_value = 0
+        self._cache_time = None
+
+    @property
+    def cache_ttl(self):
+        """:obj:`float`: Time in seconds a value read of all channels is reused by single channel reads, 0(default) disables
+        caching. While caching is enabled, reading channels one by one uses a single I2C transfer per period. Writes made
+        through this object refresh the cache, but changes the I2C-HAT makes on its own (inputs changing, or a Cwdt timeout
+        loading the digital outputs SafetyValue) are not seen until the period expires."""
+        return self._cache_ttl
+
+    @cache_ttl.setter
+    def cache_ttl(self, ttl):
+        if ttl < 0:
+            raise ValueError("'" + str(ttl) + "' is not a valid cache ttl, use 0 to disable caching")
+        self._cache_ttl = ttl
+        self._cache_time = None
+
+    def _cached_value(self):
+        # the bus lock is held from the read until the value is stored, a write can't complete and invalidate the cache in
+        # between, which would leave the value read before the write cached
+        with self._i2c_hat._i2c_bus_lock:
+            now = time.time()
+            # a wall clock step backwards also expires the cached value
+            if self._cache_time is None or not (0 <= now - self._cache_time < self._cache_ttl):
+                self._cache_value = self.value
+                self._cache_time = now
+            return self._cache_value
+
+    @property
+    def states(self):
+        """:obj:`dict`: Channel states keyed by channel label, all read using a single I2C transfer."""
+        value = self.value
+        return dict((label, (value & mask) != 0) for label, mask in zip(self._labels, self._bit_masks))
+
+    def _invalidate_cache(self):
+        self._cache_time = None
+
+
+class _Channels(object):
+    """List like object base, provides access to the channels of a _ChannelsFunctionality.
+
+    Indexing reads one channel per I2C transfer, or uses the cached value of all channels if caching is enabled. Iterating
+    reads all channels using a single I2C transfer.
+    """
+
+    __slots__ = ('_module',)
+
+    def __init__(self, module):
+        self._module = module
+
+    def __getitem__(self, index):
+        index = self._module._validate_channel_index(index)
+        if self._module._cache_ttl:
+            return (self._module._cached_value() & self._module._bit_masks[index]) != 0
+        request = self._module._i2c_hat._request_frame_(self._CMD_GET, bytearray((index,)))
+        response = self._module._i2c_hat._transfer_(request, 2)
+        data = response.data
+        if len(data) != 2 or data[0] != index:
+            raise ResponseException(self._RESPONSE_ERROR)
+        return data[1] > 0
+
+    def __len__(self):
+        return len(self._module.labels)
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def tolist(self):
+        """Gets all channel states using a single I2C transfer.
+
+        Returns:
+            :obj:`list` of :obj:`bool`: Channel states, item 0 is channel 0 state and so on ..
+
+        """
+        value = self._module.value
+        return [(value & mask) != 0 for mask in self._module._bit_masks]
+
+
+class _DIIrqReg(object):
+    """IRQ registers"""
+
+    # bound once, looking up Enum members is slow on the per-call path
+    _REG_RISING_EDGE_CONTROL = Irq.RegName.DI_RISING_EDGE_CONTROL.value
+    _REG_FALLING_EDGE_CONTROL = Irq.RegName.DI_FALLING_EDGE_CONTROL.value
+    _REG_CAPTURE = Irq.RegName.DI_CAPTURE.value
+
+    __slots__ = ('_module',)
+
+    def __init__(self, module):
+        self._module = module
+
+    @property
+    def rising_edge_control(self):
+        """:obj:`int`: The value of all IRQ Control reg, 1 bit represents 1 channel."""
+        return self._module._i2c_hat.irq.get_reg(self._REG_RISING_EDGE_CONTROL)
+
+    @rising_edge_control.setter
+    def rising_edge_control(self, value):
+        self._module._validate_value(value)
+        self._module._i2c_hat.irq.set_reg(self._REG_RISING_EDGE_CONTROL, value)
+
+    @property
+    def falling_edge_control(self):
+        """:obj:`int`: The value of all IRQ Control reg, 1 bit represents 1 channel."""
+        return self._module._i2c_hat.irq.get_reg(self._REG_FALLING_EDGE_CONTROL)
+
+    @falling_edge_control.setter
+    def falling_edge_control(self, value):
+        self._module._validate_value(value)
+        self._module._i2c_hat.irq.set_reg(self._REG_FALLING_EDGE_CONTROL, value)
+
+    @property
+    def capture(self):
+        """:obj:`int`: The value of all IRQ Control reg, 1 bit represents 1 channel."""
+        return self._module._i2c_hat.irq.get_reg(self._REG_CAPTURE)
+
+    @capture.setter
+    def capture(self, value):
+        if value != 0:
+            raise Exception("Value " + str(value) + " not allowed, only 0 is allowed, use 0 to clear the DI IRQ Capture Queue")
+        self._module._i2c_hat.irq.set_reg(self._REG_CAPTURE, value)
+
+
+class _DIChannels(_Channels):
+    """List like object, provides access to digital inputs channels.
+
+    Indexing reads one channel per I2C transfer, iterating reads all channels using a single I2C transfer.
+    """
+
+    _CMD_GET = Command.DI_GET_CHANNEL_STATE
+    _RESPONSE_ERROR = 'Invalid data'
+
+    __slots__ = ()
+
+
+class _DICounters(object):
+    """List like object, provides access to digital inputs counters of one type."""
+
+    _CMD_GET = Command.DI_GET_COUNTER
+    _CMD_RESET = Command.DI_RESET_COUNTER
+
+    __slots__ = ('_module', '_counter_type')
+
+    def __init__(self, module, counter_type):
+        self._module = module
+        self._counter_type = counter_type
+
+    def __getitem__(self, index):
+        index = self._module._validate_channel_index(index)
+        request = self._module._i2c_hat._request_frame_(self._CMD_GET, bytearray((index, self._counter_type)))
+        response = self._module._i2c_hat._transfer_(request, 6)
+        data = response.data
+        if (len(data) != 1 + 1 + 4) or (index != data[0]) or (self._counter_type != data[1]):
+            raise ResponseException('Invalid data')
+        return _U32.unpack_from(data, 2)[0]
+
+    def __setitem__(self, index, value):
+        index = self._module._validate_channel_index(index)
+        if value != 0:
+            raise ValueError("only '0' is valid, it will reset the counter")
+        request = self._module._i2c_hat._request_frame_(self._CMD_RESET, bytearray((index, self._counter_type)))
+        response = self._module._i2c_hat._transfer_(request, 2)
+        data = response.data
+        if (len(data) != 2) or (index != data[0]) or (self._counter_type != data[1]):
+            raise ResponseException('Invalid data')
+
+    def __len__(self):
+        return len(self._module.labels)
+
+
+class DigitalInputs(_ChannelsFunctionality):
     """Attributes and methods needed for operating the digital inputs channels.
 
     Args:
@@ -19,88 +205,14 @@ class DigitalInputs(Functionality):
         f_counters (:obj:`list` of :obj:`int`): List like object, provides access to falling edge digital input counters.
     """
 
+    __slots__ = ('channels', 'r_counters', 'f_counters', 'irq_reg')
+
     def __init__(self, i2c_hat, labels):
-        Functionality.__init__(self, i2c_hat, labels)
-        outer_instance = self
-
-        class IRQReg(object):
-            """IRQ registers"""
-
-            @property
-            def rising_edge_control(self):
-                """:obj:`int`: The value of all IRQ Control reg, 1 bit represents 1 channel."""
-                return i2c_hat.irq.get_reg(Irq.RegName.DI_RISING_EDGE_CONTROL.value)
-
-            @rising_edge_control.setter
-            def rising_edge_control(self, value):
-                outer_instance._validate_value(value)
-                i2c_hat.irq.set_reg(Irq.RegName.DI_RISING_EDGE_CONTROL.value, value)
-
-            @property
-            def falling_edge_control(self):
-                """:obj:`int`: The value of all IRQ Control reg, 1 bit represents 1 channel."""
-                return i2c_hat.irq.get_reg(Irq.RegName.DI_FALLING_EDGE_CONTROL.value)
-
-            @falling_edge_control.setter
-            def falling_edge_control(self, value):
-                outer_instance._validate_value(value)
-                i2c_hat.irq.set_reg(Irq.RegName.DI_FALLING_EDGE_CONTROL.value, value)
-
-            @property
-            def capture(self):
-                """:obj:`int`: The value of all IRQ Control reg, 1 bit represents 1 channel."""
-                return i2c_hat.irq.get_reg(Irq.RegName.DI_CAPTURE.value)
-
-            @capture.setter
-            def capture(self, value):
-                if value != 0:
-                    raise Exception("Value " + str(value) + " not allowed, only 0 is allowed, use 0 to clear the DI IRQ Capture Queue")
-                i2c_hat.irq.set_reg(Irq.RegName.DI_CAPTURE.value, value)
-
-
-        class Channels(object):
-            def __getitem__(self, index):
-                index = outer_instance._validate_channel_index(index)
-                request = outer_instance._i2c_hat._request_frame_(Command.DI_GET_CHANNEL_STATE, [index])
-                response = outer_instance._i2c_hat._transfer_(request, 2)
-                data = response.data
-                if len(data) != 2 or data[0] != index:
-                    raise ResponseException('Invalid data')
-                return data[1] > 0
-
-            def __len__(self):
-                return len(outer_instance.labels)
-
-        class Counters(object):
-            def __init__(self, counter_type):
-                self.__counter_type = counter_type
-
-            def __getitem__(self, index):
-                index = outer_instance._validate_channel_index(index)
-                request = outer_instance._i2c_hat._request_frame_(Command.DI_GET_COUNTER, [index, self.__counter_type])
-                response = outer_instance._i2c_hat._transfer_(request, 6)
-                data = response.data
-                if (len(data) != 1 + 1 + 4) or (index != data[0]) or (self.__counter_type != data[1]):
-                    raise ResponseException('Invalid data')
-                return data[2] + (data[3] << 8) + (data[4] << 16) + (data[5] << 24)
-
-            def __setitem__(self, index, value):
-                index = outer_instance._validate_channel_index(index)
-                if value != 0:
-                    raise ValueError("only '0' is valid, it will reset the counter")
-                request = outer_instance._i2c_hat._request_frame_(Command.DI_RESET_COUNTER, [index, self.__counter_type])
-                response = outer_instance._i2c_hat._transfer_(request, 2)
-                data = response.data
-                if (len(data) != 2) or (index != data[0]) or (self.__counter_type != data[1]):
-                    raise ResponseException('Invalid data')
-
-            def __len__(self):
-                return len(outer_instance.labels)
-
-        self.channels = Channels()
-        self.r_counters = Counters(1)
-        self.f_counters = Counters(0)
-        self.irq_reg = IRQReg()
+        _ChannelsFunctionality.__init__(self, i2c_hat, labels)
+        self.channels = _DIChannels(self)
+        self.r_counters = _DICounters(self, 1)
+        self.f_counters = _DICounters(self, 0)
+        self.irq_reg = _DIIrqReg(self)
 
     @property
     def value(self):
@@ -121,7 +233,36 @@ class DigitalInputs(Functionality):
             raise ResponseException('Invalid data')
 
 
-class DigitalOutputs(Functionality):
+class _DOChannels(_Channels):
+    """List like object, provides single channel access to digital outputs.
+
+    Indexing reads or writes one channel per I2C transfer, iterating reads all channels using a single I2C transfer.
+    Use DigitalOutputs.value to write all channels using a single I2C transfer.
+    """
+
+    _CMD_GET = Command.DQ_GET_CHANNEL_STATE
+    _CMD_SET = Command.DQ_SET_CHANNEL_STATE
+    _RESPONSE_ERROR = 'unexpected format'
+
+    __slots__ = ()
+
+    def __setitem__(self, index, value):
+        index = self._module._validate_channel_index(index)
+        value = int(value)
+        if not (0 <= value <= 1):
+            raise ValueError("'" + str(value) + "' is not a valid value, use: 0 or 1, True or False")
+        data = bytearray((index, value))
+        request = self._module._i2c_hat._request_frame_(self._CMD_SET, data)
+        try:
+            response = self._module._i2c_hat._transfer_(request, 2)
+        finally:
+            # after the write, a read cached while the write was pending holds the old state
+            self._module._invalidate_cache()
+        if data != response.data:
+            raise ResponseException('unexpected format')
+
+
+class DigitalOutputs(_ChannelsFunctionality):
     """Attributes and methods needed for operating the digital outputs channels.
 
     Args:
@@ -133,35 +274,11 @@ class DigitalOutputs(Functionality):
 
     """
 
+    __slots__ = ('channels',)
+
     def __init__(self, i2c_hat, labels):
-        Functionality.__init__(self, i2c_hat, labels)
-        outer_instance = self
-
-        class Channels(object):
-            def __getitem__(self, index):
-                index = outer_instance._validate_channel_index(index)
-                request = outer_instance._i2c_hat._request_frame_(Command.DQ_GET_CHANNEL_STATE, [index])
-                response = outer_instance._i2c_hat._transfer_(request, 2)
-                data = response.data
-                if len(data) != 2 or data[0] != index:
-                    raise ResponseException('unexpected format')
-                return data[1] > 0
-
-            def __setitem__(self, index, value):
-                index = outer_instance._validate_channel_index(index)
-                value = int(value)
-                if not (0 <= value <= 1):
-                    raise ValueError("'" + str(value) + "' is not a valid value, use: 0 or 1, True or False")
-                data = [index, value]
-                request = outer_instance._i2c_hat._request_frame_(Command.DQ_SET_CHANNEL_STATE, data)
-                response = outer_instance._i2c_hat._transfer_(request, 2)
-                if data != response.data:
-                    raise ResponseException('unexpected format')
-
-            def __len__(self):
-                return len(outer_instance.labels)
-
-        self.channels = Channels()
+        _ChannelsFunctionality.__init__(self, i2c_hat, labels)
+        self.channels = _DOChannels(self)
 
     @property
     def value(self):
@@ -171,7 +288,40 @@ class DigitalOutputs(Functionality):
     @value.setter
     def value(self, value):
         self._validate_value(value)
-        self._i2c_hat._set_u32_value_(Command.DQ_SET_ALL_CHANNEL_STATES, value)
+        try:
+            self._i2c_hat._set_u32_value_(Command.DQ_SET_ALL_CHANNEL_STATES, value)
+        finally:
+            self._invalidate_cache()
+
+    def update_states(self, states):
+        """Sets a number of digital output channel states, the other channels are left unchanged. Uses two I2C transfers,
+        one to read and one to write all channel states, no other thread can access the I2C-HAT in between.
+
+        Args:
+            states (:obj:`dict`): Channel states keyed by channel index or label, e.g. {0: True, 'Q2': False}
+
+        Raises:
+            :obj:`raspihats.i2c_hats._base.ResponseException`: If the response hasn't got the expected format
+
+        """
+        mask = 0
+        bits = 0
+        for index, state in states.items():
+            index = self._validate_channel_index(index)
+            state = int(state)
+            if not (0 <= state <= 1):
+                raise ValueError("'" + str(state) + "' is not a valid value, use: 0 or 1, True or False")
+            mask |= self._bit_masks[index]
+            if state:
+                bits |= self._bit_masks[index]
+        if mask == 0:
+            return
+        with self._i2c_hat._i2c_bus_lock:
+            value = self._i2c_hat._get_u32_value_(Command.DQ_GET_ALL_CHANNEL_STATES)
+            try:
+                self._i2c_hat._set_u32_value_(Command.DQ_SET_ALL_CHANNEL_STATES, (value & ~mask) | bits)
+            finally:
+                self._invalidate_cache()
 
     @property
     def power_on_value(self):
@@ -193,3 +343,24 @@ class DigitalOutputs(Functionality):
     def safety_value(self, value):
         self._validate_value(value)
         self._i2c_hat._set_u32_value_(Command.DQ_SET_SAFETY_VALUE, value)
+
+    def snapshot(self):
+        """Gets the digital outputs value, Power On Value and Safety Value. The I2C bus is held for all three
+        transfers, so no other thread can access the I2C-HAT in between.
+
+        Returns:
+            :obj:`tuple` of :obj:`int`: (value, power_on_value, safety_value)
+
+        """
+        i2c_hat = self._i2c_hat
+        responses = i2c_hat._transfer_batch_([
+            (i2c_hat._request_frame_(Command.DQ_GET_ALL_CHANNEL_STATES), 4),
+            (i2c_hat._request_frame_(Command.DQ_GET_POWER_ON_VALUE), 4),
+            (i2c_hat._request_frame_(Command.DQ_GET_SAFETY_VALUE), 4)
+        ])
+        values = []
+        for response in responses:
+            if len(response.data) != 4:
+                raise ResponseException('invalid response data length')
+            values.append(_U32.unpack(response.data)[0])
+        return tuple(values)
@@ -1,12 +1,17 @@
 """
 This module contains the I2C Frame class and related classes.
 """
+import struct
+import numbers
 try:
   from enum import Enum
 except ImportError:
   from enum34 import Enum
 from .. import crc16
 
+# the frame Crc is sent little endian
+_CRC = struct.Struct('<H')
+
 class Command(Enum):
     """I2C-HAT commands"""
 
@@ -60,12 +65,12 @@ class Frame(object):
     Args:
         id (:obj:`int`): ID byte
         cmd (:obj:`int`): Command byte
-        data (:obj:`list` of :obj:`int`): Payload data bytes
+        data (:obj:`list` of :obj:`int` or :obj:`bytearray`): Payload data bytes
 
     Attributes:
         id (:obj:`int`): ID byte
         cmd (:obj:`int`): Command byte
-        data (:obj:`list` of :obj:`int`): Payload data bytes
+        data (:obj:`bytearray`): Payload data bytes
 
     """
 
@@ -73,43 +78,58 @@ class Frame(object):
     ID_SIZE = 1
     CMD_SIZE = 1
     CRC_SIZE = 2
+    # size of a frame with no payload
+    OVERHEAD_SIZE = ID_SIZE + CMD_SIZE + CRC_SIZE
+
+    __slots__ = ('id', 'cmd', 'data')
 
-    def __init__(self, id, cmd, data=[]):
+    def __init__(self, id, cmd, data=b''):
         self.id = id
-        self.cmd = Command(cmd)
-        self.data = data
+        # Command(cmd) is slow even for a Command member, all callers in the package pass members
+        self.cmd = cmd if isinstance(cmd, Command) else Command(cmd)
+        # bytearray(n) would make n zero bytes, an int is not a payload
+        if isinstance(data, numbers.Integral):
+            raise ValueError("Expecting uint8 values")
+        self.data = bytearray(data)
 
     def encode(self):
-        """Encode the frame fields: Id, Command, Data and Crc to a list of ints.
+        """Encode the frame fields: Id, Command, Data and Crc to a bytearray.
 
         Returns:
-            :obj:`list` of :obj:`int`: List of frame bytes, raw data that can be transmitted over the I2C bus
+            :obj:`bytearray`: Frame bytes, raw data that can be transmitted over the I2C bus
 
         """
-        data = [self.id, self.cmd.value] + self.data
-        crc = crc16.modbus(data)
-        return data + [(crc & 0xFF), ((crc >> 8) & 0xFF)]
+        data = bytearray((self.id, self.cmd.value))
+        data += self.data
+        data += _CRC.pack(crc16.modbus(data))
+        return data
 
     def decode(self, data):
         """Decode raw data from I2C bus. It's used to decode the I2C-HATs response. The fields Id and Command should already be set
         because a valid I2C-HAT response always has the same Id and Command bytes as the request.
 
         Args:
-            data (:obj:`list` of :obj:`int`): Raw I2C data to be decoded
+            data (:obj:`list` of :obj:`int` or :obj:`bytearray`): Raw I2C data to be decoded
 
         Raises:
-            :obj:`DecodeException`: If the response frame Crc check fails, or has an unexpected Id or Command
+            :obj:`DecodeException`: If the response frame is too short, Crc check fails, or has an unexpected Id or Command
 
         """
-        crc = crc16.modbus(data[:-2])
-        crc_in = (data[-1] << 8) + data[-2]
-        if crc != crc_in:
-            #print('crc check failed, ' + hex(crc) + '!=' + hex(crc_in) + str([hex(x) for x in data]))
-            raise DecodeException('crc check failed, ' + hex(crc) + '!=' + hex(crc_in) + ' data:' + str([hex(x) for x in data]))
+        if not isinstance(data, bytearray):
+            data = bytearray(data)
+        if len(data) < self.OVERHEAD_SIZE:
+            raise DecodeException('frame too short, ' + str(len(data)) + ' bytes')
+        # Id and Command are checked first, a response to another request is rejected without running the CRC
         if self.id != data[0]:
             #print('unexpected id')
             raise DecodeException('unexpected id')
         if self.cmd.value != data[1]:
             #print('unexpected command')
             raise DecodeException('unexpected command')
+        # the Modbus CRC of a frame followed by its own CRC(little endian) is 0, so the CRC bytes don't have to be sliced off
+        if crc16.modbus(data) != 0:
+            crc = crc16.modbus(data[:-2])
+            crc_in = _CRC.unpack_from(data, len(data) - 2)[0]
+            #print('crc check failed, ' + hex(crc) + '!=' + hex(crc_in) + str([hex(x) for x in data]))
+            raise DecodeException('crc check failed, ' + hex(crc) + '!=' + hex(crc_in) + ' data:' + str([hex(x) for x in data]))
         self.data = data[2:-2]